@@ -0,0 +1,261 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fleet layout used when generating groups_config.yaml
+REPOS_PER_PROJECT = 2
+PROJECTS_PER_GROUP = 10
+
+RUNS_PATH = re.compile(r"^/repos/([^/]+/[^/]+)/actions/runs$")
+
+class MockGitHub:
+    def __init__(self, latency, jitter, forbidden_rate, not_found_rate, error_rate, max_runs, rate_limit):
+        self.latency = latency
+        self.jitter = jitter
+        self.forbidden_rate = forbidden_rate
+        self.not_found_rate = not_found_rate
+        self.error_rate = error_rate
+        self.max_runs = max_runs
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset = int(time.time()) + 3600
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def repo_fraction(self, repo, salt):
+        # Stable per-repo value in [0, 1) so every sweep sees the same fleet
+        return (zlib.crc32(f"{salt}:{repo}".encode()) % 10000) / 10000
+
+    def runs_for(self, repo):
+        today = datetime.now().date().isoformat()
+        count = int(self.repo_fraction(repo, "runs") * (self.max_runs + 1))
+        conclusions = ["success", "failure", "timed_out", "cancelled"]
+        return [
+            {
+                "id": 1000000 - index,
+                "status": "completed",
+                "conclusion": conclusions[zlib.crc32(f"{repo}:{index}".encode()) % len(conclusions)],
+                "created_at": f"{today}T{23 - index * 23 // max(count, 1):02d}:00:00Z",
+            }
+            for index in range(count)
+        ]
+
+    def handle(self, path, query):
+        with self.lock:
+            self.requests += 1
+            if self.remaining <= 0:
+                return 403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(self.reset)}, {"message": "API rate limit exceeded"}
+            self.remaining -= 1
+            rate_headers = {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.remaining),
+                "X-RateLimit-Reset": str(self.reset),
+            }
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        match = RUNS_PATH.match(path)
+        if not match:
+            return 404, rate_headers, {"message": "Not Found"}
+        repo = match.group(1)
+        if random.random() < self.error_rate:
+            return 502, rate_headers, {"message": "Server Error"}
+        if self.repo_fraction(repo, "forbidden") < self.forbidden_rate:
+            return 403, rate_headers, {"message": "Repository access blocked"}
+        if self.repo_fraction(repo, "not_found") < self.not_found_rate:
+            return 404, rate_headers, {"message": "Not Found"}
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        runs = self.runs_for(repo)
+        body = {"total_count": len(runs), "workflow_runs": runs[(page - 1) * per_page:page * per_page]}
+        return 200, rate_headers, body
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like api.github.com
+        disable_nagle_algorithm = True  # Headers and body are written separately
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, headers, body = mock.handle(url.path, parse_qs(url.query))
+            payload = json.dumps(body).encode()
+            etag = f'"{zlib.crc32(payload):08x}"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if status == 200:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve_mock(mock_args, port_queue):
+    # The mock is built here: its lock cannot be pickled for spawn and forkserver children
+    mock = MockGitHub(*mock_args)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(mock))
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+def generate_fleet(repo_count):
+    config = {}
+    projects_needed = -(-repo_count // REPOS_PER_PROJECT)
+    for project_index in range(projects_needed):
+        group_key = f"Group{project_index // PROJECTS_PER_GROUP + 1}"
+        group = config.setdefault(group_key, {"name": f"Bench Group {project_index // PROJECTS_PER_GROUP + 1}", "projects": {}})
+        first = project_index * REPOS_PER_PROJECT
+        group["projects"][f"Project{project_index + 1}"] = {
+            "name": f"Bench Project {project_index + 1}",
+            "repositories": [f"bench-org/svc-{index:05d}" for index in range(first, min(first + REPOS_PER_PROJECT, repo_count))],
+        }
+    return config
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_benchmark(your_script, repo_count, workdir, max_workers):
+    # Write the fleet out and read it back the same way the script reads its config
+    config_path = os.path.join(workdir, f"groups_config_{repo_count}.yaml")
+    with open(config_path, "w") as config_file:
+        yaml.safe_dump(generate_fleet(repo_count), config_file)
+    with open(config_path) as config_file:
+        config = yaml.safe_load(config_file)
+
+    # Start every run with a cold response cache
+    your_script.response_cache = your_script.ResponseCache(
+        tempfile.mkdtemp(dir=workdir), your_script.CACHE_MAX_AGE, your_script.CACHE_MAX_BYTES)
+
+    latencies = []
+    latency_lock = threading.Lock()
+    session = your_script.get_session()
+    session_get = session.get
+
+    def timed_get(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return session_get(*args, **kwargs)
+        finally:
+            with latency_lock:
+                latencies.append(time.perf_counter() - start)
+
+    session.get = timed_get
+    start = time.perf_counter()
+    try:
+        your_script.run_sweep(config, max_workers=max_workers, notify=False)
+    finally:
+        wall_time = time.perf_counter() - start
+        session.get = session_get
+    # Peak RSS of this process; fleet sizes run in ascending order so it tracks the current size
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    return {
+        "repos": repo_count,
+        "requests": len(latencies),
+        "wall_time_s": round(wall_time, 3),
+        "requests_per_s": round(len(latencies) / wall_time, 1) if wall_time else 0.0,
+        "p50_latency_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_latency_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "peak_memory_mb": round(peak_memory / (1024 * 1024), 2),
+    }
+
+def measure_startup(runs):
+    # Median time for a fresh interpreter to import the script, minus bare interpreter startup
+    def median_run(code):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True, cwd=SCRIPT_DIR)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    subprocess.run([sys.executable, "-c", "import your_script"], check=True, cwd=SCRIPT_DIR)  # Warm the config cache
+    return max(0.0, median_run("import your_script") - median_run("pass"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a workflow status sweep against a local mock GitHub API.")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma separated fleet sizes (repositories)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mean simulated API latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.005, help="Latency jitter in seconds")
+    parser.add_argument("--forbidden-rate", type=float, default=0.02, help="Fraction of repos answering 403")
+    parser.add_argument("--not-found-rate", type=float, default=0.02, help="Fraction of repos answering 404")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Fraction of requests answering 502")
+    parser.add_argument("--max-runs", type=int, default=150, help="Maximum runs per repo today (exercises pagination)")
+    parser.add_argument("--rate-limit", type=int, default=1000000, help="Simulated X-RateLimit-Limit")
+    parser.add_argument("--retry-delay", type=float, default=0.05, help="Override RETRY_DELAY for the run")
+    parser.add_argument("--workers", type=int, default=None, help="Override MAX_WORKERS for the run")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    parser.add_argument("--startup", action="store_true", help="Only measure the time to import your_script.py")
+    parser.add_argument("--startup-runs", type=int, default=10, help="Interpreter launches per startup measurement")
+    parser.add_argument("--startup-budget-ms", type=float, default=100, help="Fail when importing takes longer than this")
+    args = parser.parse_args()
+
+    if args.startup:
+        startup_ms = measure_startup(args.startup_runs) * 1000
+        print(f"import your_script: {startup_ms:.1f} ms (budget {args.startup_budget_ms:.0f} ms)")
+        sys.exit(1 if startup_ms > args.startup_budget_ms else 0)
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    mock_args = (args.latency, args.jitter, args.forbidden_rate, args.not_found_rate,
+                 args.error_rate, args.max_runs, args.rate_limit)
+    # The mock runs in its own process so it does not compete with the sweep for the GIL
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve_mock, args=(mock_args, port_queue), daemon=True)
+    server.start()
+    port = port_queue.get()
+
+    workdir = tempfile.mkdtemp(prefix="workflow-bench-")
+    # Point the script at the mock server before it is imported; enough tokens that the
+    # client-side limiter never becomes the bottleneck
+    os.environ["GITHUB_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["GITHUB_TOKENS"] = ",".join(f"bench-token-{index}" for index in range(max(sizes) // 4000 + 1))
+    os.environ["GITHUB_CACHE_DIR"] = workdir
+    os.environ.pop("STATE_DB", None)
+    os.chdir(SCRIPT_DIR)
+    sys.path.insert(0, SCRIPT_DIR)
+    import your_script
+
+    your_script.RETRY_DELAY = args.retry_delay
+    max_workers = args.workers or your_script.MAX_WORKERS
+
+    results = []
+    print(f"{'repos':>7} {'requests':>9} {'wall s':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+    for size in sorted(sizes):
+        result = run_benchmark(your_script, size, workdir, max_workers)
+        results.append(result)
+        print(f"{result['repos']:>7} {result['requests']:>9} {result['wall_time_s']:>8} {result['requests_per_s']:>8} "
+              f"{result['p50_latency_ms']:>8} {result['p99_latency_ms']:>8} {result['peak_memory_mb']:>8}")
+
+    server.terminate()
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,98 @@
-import yaml
-from concurrent.futures import ThreadPoolExecutor
-import requests
+from concurrent.futures import Future, ThreadPoolExecutor
+import csv
+import hashlib
+import heapq
+import hmac
+import importlib
+import itertools
+import json
 import os
+import random
+import re
+import threading
 import time
-from datetime import datetime
-import apprise
-from ratelimit import limits, sleep_and_retry
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatchcase
+from urllib.parse import parse_qs, urlencode, urlparse
+
+class LazyModule:
+    # Imports the module on first attribute access, keeping heavy dependencies out of startup
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+yaml = LazyModule("yaml")
+requests = LazyModule("requests")
+apprise = LazyModule("apprise")
+ratelimit = LazyModule("ratelimit")
+sqlite3 = LazyModule("sqlite3")
+argparse = LazyModule("argparse")
+gzip = LazyModule("gzip")
 
 # Pull the webhook URL from environment variables
 DISCORD_WEBHOOK = os.getenv("DISCORD_WEBHOOK")
 
+# GitHub API endpoint, overridable for GitHub Enterprise or a local mock server
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# GitHub API tokens, comma separated in GITHUB_TOKENS or a single GITHUB_TOKEN
+GITHUB_TOKENS = [token.strip() for token in (os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN", "")).split(",") if token.strip()]
+
+# Parsed YAML files are cached here and reused until the source file changes
+CONFIG_CACHE_DIR = os.getenv("CONFIG_CACHE_DIR", ".cache/config")
+
+def load_yaml(path):
+    stat = os.stat(path)
+    cache_path = os.path.join(CONFIG_CACHE_DIR, hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16] + ".json")
+    try:
+        with open(cache_path, "rb") as cache_file:
+            cached = json.load(cache_file)
+    except Exception:
+        cached = None
+    if not isinstance(cached, dict) or not {"mtime_ns", "size", "sha256", "data"} <= cached.keys():
+        cached = None
+    # Unchanged mtime and size: trust the cache without reading the source
+    if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+        return cached["data"]
+    with open(path, "rb") as source_file:
+        raw = source_file.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    # Touched but identical content (e.g. a fresh checkout) reuses the cached parse
+    if cached and cached["sha256"] == digest:
+        data = cached["data"]
+    else:
+        data = yaml.load(raw, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    # JSON rather than pickle: loading a tampered cache must not run code. Configs it cannot
+    # represent exactly (dates, non-string keys) are simply not cached.
+    try:
+        encoded = json.dumps({"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest, "data": data})
+    except (TypeError, ValueError):
+        encoded = None
+    if encoded and json.loads(encoded)["data"] == data:
+        try:
+            os.makedirs(CONFIG_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as cache_file:
+                cache_file.write(encoded)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # A read-only checkout still works, just without the cache
+    return data
+
 # Load configuration from YAML files
-with open('groups_config.yaml') as config_file:
-    CONFIG = yaml.safe_load(config_file)
+CONFIG = load_yaml('groups_config.yaml')
 
 # Load custom messages if available
 try:
-    with open('custom_messages.yaml') as custom_file:
-        CUSTOM_MESSAGES = yaml.safe_load(custom_file)
+    CUSTOM_MESSAGES = load_yaml('custom_messages.yaml')
 except FileNotFoundError:
     CUSTOM_MESSAGES = None
 
@@ -25,135 +100,1827 @@ except FileNotFoundError:
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
 
+# Circuit breaker settings
+BREAKER_WINDOW = 20  # Recent requests considered per endpoint
+BREAKER_THRESHOLD = 0.5  # Error rate that opens the breaker
+BREAKER_COOLDOWN = 60  # seconds before the endpoint is tried again
+
 # Rate limit settings
 RATE_LIMIT = 5000  # Number of requests allowed per hour
+UNAUTHENTICATED_RATE_LIMIT = 60  # Number of requests allowed per hour without a token
 RESET_TIME = 3600  # Time in seconds after which rate limit resets
 RATE_LIMIT_BUFFER = 50  # Buffer to avoid hitting the limit exactly
+SECONDARY_RATE_LIMIT_DELAY = 60  # seconds, used when a secondary limit gives no Retry-After
 
 NOTIFICATIONS_PER_HOUR = 60  # Apprise notifications limit per hour
+NOTIFICATION_TITLE = "GitHub Action Notification"
+DIGEST_CHUNK_SIZE = 1900  # Discord allows 2000 characters per message, title included
+
+# Workflow run listing settings
+RUNS_PER_PAGE = 100  # Maximum page size allowed by the API
+
+# Concurrency settings
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "5"))  # Worker threads for per-repo fetch tasks
+
+# Connection settings
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "10"))  # Maximum concurrent API requests
+REQUEST_TIMEOUT = 30  # seconds
+
+# Response cache settings
+CACHE_DIR = os.getenv("GITHUB_CACHE_DIR", ".cache/github-api")  # Restored between runs by the workflow
+CACHE_MAX_AGE = 7 * 24 * 3600  # seconds
+CACHE_MAX_BYTES = 50 * 1024 * 1024  # Total size of cached response bodies
+
+# Repository discovery settings
+DISCOVERY_CACHE_DIR = os.getenv("DISCOVERY_CACHE_DIR", ".cache/discovery")
+DISCOVERY_TTL = int(os.getenv("DISCOVERY_TTL", str(6 * 3600)))  # seconds before an owner's repo list is fetched again
+REPOS_PER_PAGE = 100  # Maximum page size allowed by the API
+
+# Incremental state settings
+STATE_DB = os.getenv("STATE_DB")  # SQLite file; enables incremental sweeps when set
+END_OF_DAY_HOUR = int(os.getenv("END_OF_DAY_HOUR", "23"))  # Missing-run scenarios are only reported from this hour on
+
+# Watch mode settings
+WATCH_MIN_INTERVAL = 300  # seconds between polls of a repo that just failed or usually runs about now
+WATCH_BASE_INTERVAL = 1800  # seconds between polls of a repo with nothing to go on yet
+WATCH_MAX_INTERVAL = 4 * 3600  # seconds; quiet repos back off up to this
+WATCH_BUDGET_FRACTION = 0.8  # Share of the hourly API budget watch mode may spend on polling
+
+# Webhook receiver settings
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Required; used to verify X-Hub-Signature-256
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_COVERAGE_DAYS = 7  # Repos silent for longer than this are polled again
+
+# Failure drill-down settings
+DRILL_DOWN_BUDGET = int(os.getenv("DRILL_DOWN_BUDGET", "0"))  # Requests per hour for failing-step lookups; 0 disables them
+DRILL_DOWN_RESERVE = 500  # Drill-down stops while fewer API requests than this are left for the sweep
+DRILL_DOWN_CONCLUSIONS = ("failure", "timed_out", "cancelled")  # Job and step conclusions to blame, in order of preference
+DRILL_DOWN_LOG_LINES = int(os.getenv("DRILL_DOWN_LOG_LINES", "10"))  # Log lines attached to the notification
+DRILL_DOWN_LOG_BYTES = 16 * 1024  # Only this much of the end of a job log is requested
+DRILL_DOWN_LINE_LENGTH = 200  # Longer log lines are cut
+
+# Fetch backend settings
+# "graphql" is a lossy mode: it asks about many repositories per request, but a repo with a success on its
+# default branch head is settled from that head alone, so failures newer than it on other branches or
+# commits are not reported. Everything else falls back to REST.
+FETCH_BACKEND = os.getenv("FETCH_BACKEND", "rest")
+GITHUB_GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", f"{GITHUB_API_URL}/graphql")  # GitHub Enterprise uses /api/graphql
+GRAPHQL_RATE_LIMIT = 5000  # Points allowed per hour per token, separate from the REST limit
+GRAPHQL_BATCH_SIZE = 50  # Repositories per query
+GRAPHQL_SUITES_PER_REPO = 10  # Most recent check suites read from each default branch head
+ACTIONS_APP_ID = 15368  # Check suites created by GitHub Actions
+
+# Report settings
+REPORT_FILE = os.getenv("REPORT_FILE")  # Streams result records as JSONL, or CSV when the name ends in .csv
+
+# Metrics settings
+METRICS_DIR = os.getenv("METRICS_DIR")  # Writes metrics.json and metrics.prom at the end of each sweep when set
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT")  # Writes cProfile stats for the whole run when set
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # seconds
+
+class Metrics:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.setdefault(key, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def merge(self, summary):
+        # Adds another process's summary() into this one
+        with self.lock:
+            for counter in summary["counters"]:
+                key = (counter["name"], tuple(sorted(counter["labels"].items())))
+                self.counters[key] = self.counters.get(key, 0) + counter["value"]
+            for gauge in summary["gauges"]:
+                self.gauges[(gauge["name"], tuple(sorted(gauge["labels"].items())))] = gauge["value"]
+            for other in summary["histograms"]:
+                key = (other["name"], tuple(sorted(other["labels"].items())))
+                histogram = self.histograms.setdefault(key, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0})
+                for index, bound in enumerate(LATENCY_BUCKETS):
+                    histogram["buckets"][index] += other["buckets"][bound]
+                histogram["sum"] += other["sum"]
+                histogram["count"] += other["count"]
+
+    def summary(self):
+        with self.lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()],
+                "gauges": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.gauges.items()],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "buckets": dict(zip(LATENCY_BUCKETS, histogram["buckets"])),
+                     "sum": histogram["sum"], "count": histogram["count"]}
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def prometheus(self):
+        def render_labels(labels):
+            if not labels:
+                return ""
+            escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+        lines = []
+        with self.lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in series}):
+                    lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+                    for (series_name, labels), value in series.items():
+                        if series_name == name:
+                            lines.append(f"{self.prefix}_{name}{render_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                for (series_name, labels), histogram in self.histograms.items():
+                    if series_name != name:
+                        continue
+                    for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                        lines.append(f"{self.prefix}_{name}_bucket{render_labels(labels + (('le', bound),))} {count}")
+                    lines.append(f"{self.prefix}_{name}_bucket{render_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                    lines.append(f"{self.prefix}_{name}_sum{render_labels(labels)} {histogram['sum']}")
+                    lines.append(f"{self.prefix}_{name}_count{render_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "metrics.json"), "w") as json_file:
+            json.dump(self.summary(), json_file, indent=2)
+        with open(os.path.join(directory, "metrics.prom"), "w") as prom_file:
+            prom_file.write(self.prometheus())
+
+metrics = Metrics("workflow_sweep")
+
+# Shared session so every request reuses pooled keep-alive connections, created on first use
+session = None
+session_lock = threading.Lock()
+in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+def get_session():
+    global session
+    with session_lock:
+        if session is None:
+            session = requests.Session()
+            session.headers.update({"Accept": "application/vnd.github+json"})
+            session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_IN_FLIGHT))
+            session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_IN_FLIGHT))
+        return session
+
+def is_rate_limited(response):
+    if response.status_code not in (403, 429):
+        return False
+    return (
+        "Retry-After" in response.headers
+        or response.headers.get("X-RateLimit-Remaining") == "0"
+        or "rate limit" in response.text.lower()
+    )
 
 class RateLimiter:
     def __init__(self, limit, period):
         self.limit = limit
         self.period = period
-        self.requests = []
-    
-    def check_limit(self):
+        self.buffer = min(RATE_LIMIT_BUFFER, limit // 10)  # Keep small quotas usable
+        self.capacity = limit - self.buffer
+        self.tokens = float(self.capacity)
+        self.updated = time.time()
+        self.server_remaining = None  # Last X-RateLimit-Remaining seen
+        self.server_reset = 0.0  # Last X-RateLimit-Reset seen (epoch seconds)
+        self.blocked_until = 0.0  # Set by Retry-After and secondary rate limits
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.server_remaining is not None and now >= self.server_reset:
+            # The server window has reset, so the full budget is available again
+            self.server_remaining = None
+            self.tokens = float(self.capacity)
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.limit / self.period)
+        self.updated = now
+
+    def _wait_time(self, now, cost=1):
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.server_remaining is not None and now < self.server_reset and self.server_remaining - cost < self.buffer:
+            return self.server_reset - now
+        if self.tokens < cost:
+            return (cost - self.tokens) * self.period / self.limit
+        return 0
+
+    def remaining(self):
+        with self.lock:
+            now = time.time()
+            self._refill(now)
+            remaining = int(self.tokens)
+            if self.server_remaining is not None and now < self.server_reset:
+                remaining = min(remaining, self.server_remaining - self.buffer)
+            return max(remaining, 0)
+
+    def try_acquire(self):
+        # Takes a token only if one is available right now, never waits
+        with self.lock:
+            now = time.time()
+            self._refill(now)
+            if self._wait_time(now) > 0:
+                return False
+            self.tokens -= 1
+            return True
+
+    def check_limit(self, cost=1):
+        # cost is 1 for REST requests, or the expected points of a GraphQL query
+        while True:
+            with self.lock:
+                now = time.time()
+                self._refill(now)
+                wait = self._wait_time(now, cost)
+                if wait <= 0:
+                    self.tokens -= cost
+                    if self.server_remaining is not None:
+                        self.server_remaining -= cost
+                    return
+            metrics.inc("limiter_blocked_seconds_total", wait, limiter="github")
+            time.sleep(wait)
+
+    def update_from_response(self, response):
+        headers = response.headers
         now = time.time()
-        self.requests = [req for req in self.requests if now - req < self.period]
-        if len(self.requests) >= self.limit - RATE_LIMIT_BUFFER:
-            sleep_time = self.period - (now - self.requests[0])
-            time.sleep(sleep_time)
+        with self.lock:
+            if "X-RateLimit-Remaining" in headers and "X-RateLimit-Reset" in headers:
+                # Keep the local budget in sync with the server's view
+                self.server_remaining = int(headers["X-RateLimit-Remaining"])
+                self.server_reset = float(headers["X-RateLimit-Reset"])
+                self.tokens = min(self.tokens, self.server_remaining - self.buffer)
+            if is_rate_limited(response):
+                if "Retry-After" in headers:
+                    blocked_until = now + float(headers["Retry-After"])
+                elif headers.get("X-RateLimit-Remaining") == "0":
+                    blocked_until = self.server_reset
+                else:
+                    blocked_until = now + SECONDARY_RATE_LIMIT_DELAY
+                self.blocked_until = max(self.blocked_until, blocked_until)
+            elif response.status_code == 304:
+                # Conditional requests answered with 304 do not count against the budget
+                self.tokens = min(self.capacity, self.tokens + 1)
 
-    def make_request(self, url, headers=None):
+    def make_request(self, url, headers=None, stream=False):
         self.check_limit()
-        response = requests.get(url, headers=headers)
-        self.requests.append(time.time())
+        with in_flight, metrics.timer("github_request_seconds"):
+            response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=stream)
+        metrics.inc("github_responses_total", status=response.status_code)
+        self.update_from_response(response)
         return response
 
-rate_limiter = RateLimiter(RATE_LIMIT, RESET_TIME)
+class TokenPool:
+    def __init__(self, tokens):
+        # Each credential gets its own limiter so throughput scales with the number of tokens
+        self.credentials = {token: RateLimiter(RATE_LIMIT, RESET_TIME) for token in tokens}
+        self.graphql_credentials = {token: RateLimiter(GRAPHQL_RATE_LIMIT, RESET_TIME) for token in tokens}
+        self.anonymous = RateLimiter(UNAUTHENTICATED_RATE_LIMIT, RESET_TIME)
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if not self.credentials:
+                return None, self.anonymous
+            # Spread requests by always picking the token with the most budget left
+            return max(self.credentials.items(), key=lambda item: item[1].remaining())
+
+    def revoke(self, token):
+        with self.lock:
+            self.credentials.pop(token, None)
+            self.graphql_credentials.pop(token, None)
+
+    def remaining(self):
+        with self.lock:
+            limiters = list(self.credentials.values()) or [self.anonymous]
+        return sum(limiter.remaining() for limiter in limiters)
+
+    def make_request(self, url, headers=None, stream=False):
+        while True:
+            token, limiter = self.acquire()
+            request_headers = dict(headers or {})
+            if token:
+                request_headers["Authorization"] = f"Bearer {token}"
+            response = limiter.make_request(url, headers=request_headers, stream=stream)
+            if response.status_code == 401 and token:
+                self.revoke(token)  # Take bad or expired tokens out of rotation
+                continue
+            return response
+
+    def graphql(self, query, cost):
+        # GraphQL needs a token and spends points from its own per-token budget; returns None without a token
+        while True:
+            with self.lock:
+                if not self.graphql_credentials:
+                    return None
+                token, limiter = max(self.graphql_credentials.items(), key=lambda item: item[1].remaining())
+            limiter.check_limit(cost)
+            with in_flight, metrics.timer("github_request_seconds"):
+                response = get_session().post(GITHUB_GRAPHQL_URL, json={"query": query},
+                                              headers={"Authorization": f"Bearer {token}"}, timeout=REQUEST_TIMEOUT)
+            metrics.inc("graphql_responses_total", status=response.status_code)
+            limiter.update_from_response(response)
+            if response.status_code == 401:
+                self.revoke(token)
+                continue
+            return response
+
+token_pool = TokenPool(GITHUB_TOKENS)
+
+class ResponseCache:
+    def __init__(self, directory, max_age, max_bytes):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url)) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or time.time() - entry["stored_at"] > self.max_age:
+            return None
+        return entry
+
+    def put(self, url, etag, body):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump({"url": url, "etag": etag, "stored_at": time.time(), "body": body}, cache_file)
+        os.replace(tmp_path, path)  # Atomic so concurrent readers never see partial entries
 
-def get_workflow_status(repo):
-    url = f"https://api.github.com/repos/{repo}/actions/runs"
+    def evict(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        now = time.time()
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        # Drop the oldest entries until the cache fits in its size budget
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Another process sharing the directory got there first
+
+response_cache = ResponseCache(CACHE_DIR, CACHE_MAX_AGE, CACHE_MAX_BYTES)
+
+class StateStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        if self.conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS repo_state (
+                    repo TEXT PRIMARY KEY,
+                    day TEXT NOT NULL,
+                    last_updated_at TEXT,
+                    triggered INTEGER NOT NULL DEFAULT 0,
+                    success INTEGER NOT NULL DEFAULT 0,
+                    scenarios TEXT NOT NULL DEFAULT '[]'
+                );
+                CREATE TABLE IF NOT EXISTS notified (
+                    subject TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    scenario TEXT NOT NULL,
+                    PRIMARY KEY (subject, day, scenario)
+                );
+                CREATE TABLE IF NOT EXISTS webhook_runs (
+                    repo TEXT NOT NULL,
+                    run_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT,
+                    run_attempt INTEGER,
+                    status TEXT,
+                    conclusion TEXT,
+                    PRIMARY KEY (repo, run_id)
+                );
+                CREATE TABLE IF NOT EXISTS webhook_repos (
+                    repo TEXT PRIMARY KEY,
+                    last_seen TEXT NOT NULL
+                );
+            """)
+            # Databases from before these columns were part of the state
+            for table, added in (
+                ("repo_state", (("scenarios", "TEXT NOT NULL DEFAULT '[]'"), ("last_updated_at", "TEXT"))),
+                ("webhook_runs", (("updated_at", "TEXT"), ("run_attempt", "INTEGER"))),
+            ):
+                columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                for column, definition in added:
+                    if column not in columns:
+                        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return self.conn
+
+    def load(self, repo, today):
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT last_updated_at, triggered, success, scenarios FROM repo_state WHERE repo = ? AND day = ?",
+                (repo, today.isoformat()),
+            ).fetchone()
+        if row is None:
+            return {"last_updated_at": None, "triggered": False, "success": False, "scenarios": []}
+        return {"last_updated_at": row[0], "triggered": bool(row[1]), "success": bool(row[2]), "scenarios": json.loads(row[3])}
+
+    def save(self, repo, today, state):
+        with self.lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO repo_state (repo, day, last_updated_at, triggered, success, scenarios) VALUES (?, ?, ?, ?, ?, ?)",
+                (repo, today.isoformat(), state["last_updated_at"], int(state["triggered"]), int(state["success"]),
+                 json.dumps(state["scenarios"])),
+            )
+
+    def is_notified(self, subject, scenario, today):
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM notified WHERE subject = ? AND day = ? AND scenario = ?",
+                (subject, today.isoformat(), scenario),
+            ).fetchone()
+            return row is not None
+
+    def mark_notified(self, entries, today):
+        # entries are (subject, scenario) pairs; called only once their notification has been delivered
+        with self.lock:
+            self._connect().executemany(
+                "INSERT OR IGNORE INTO notified (subject, day, scenario) VALUES (?, ?, ?)",
+                [(subject, today.isoformat(), scenario) for subject, scenario in entries],
+            )
+
+    def record_webhook_run(self, repo, run):
+        with self.lock:
+            conn = self._connect()
+            # Deliveries can arrive out of order; a stale one must not overwrite a newer state of the run
+            conn.execute(
+                """INSERT INTO webhook_runs (repo, run_id, day, created_at, updated_at, run_attempt, status, conclusion)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (repo, run_id) DO UPDATE SET
+                       updated_at = excluded.updated_at, run_attempt = excluded.run_attempt,
+                       status = excluded.status, conclusion = excluded.conclusion
+                   WHERE webhook_runs.updated_at IS NULL OR excluded.updated_at >= webhook_runs.updated_at""",
+                (repo, run["id"], run["created_at"][:10], run["created_at"], run.get("updated_at") or run["created_at"],
+                 run.get("run_attempt"), run.get("status"), run.get("conclusion")),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO webhook_repos (repo, last_seen) VALUES (?, ?)",
+                (repo, datetime.now().date().isoformat()),
+            )
+
+    def webhook_repos(self, since):
+        # Repositories that delivered a webhook recently enough to trust them without polling
+        with self.lock:
+            rows = self._connect().execute("SELECT repo FROM webhook_repos WHERE last_seen >= ?", (since.isoformat(),)).fetchall()
+        return {row[0] for row in rows}
+
+    def webhook_workflows(self, repo, today):
+        # Today's runs in the same shape as an /actions/runs response, newest first
+        with self.lock:
+            rows = self._connect().execute(
+                "SELECT run_id, created_at, updated_at, run_attempt, status, conclusion FROM webhook_runs "
+                "WHERE repo = ? AND day = ? ORDER BY created_at DESC, run_id DESC",
+                (repo, today.isoformat()),
+            ).fetchall()
+        runs = [{"id": row[0], "created_at": row[1], "updated_at": row[2] or row[1], "run_attempt": row[3],
+                 "status": row[4], "conclusion": row[5]} for row in rows]
+        return {"total_count": len(runs), "workflow_runs": runs}
+
+    def prune(self, today):
+        with self.lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM repo_state WHERE day < ?", (today.isoformat(),))
+            conn.execute("DELETE FROM notified WHERE day < ?", (today.isoformat(),))
+            conn.execute("DELETE FROM webhook_runs WHERE day < ?", (today.isoformat(),))
+            conn.execute("DELETE FROM webhook_repos WHERE last_seen < ?", ((today - timedelta(days=WEBHOOK_COVERAGE_DAYS)).isoformat(),))
+
+state_store = StateStore(STATE_DB) if STATE_DB else None
+
+class CircuitBreaker:
+    # Fails fast once the recent error rate of an endpoint crosses the threshold
+    def __init__(self, threshold, window, cooldown):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if time.time() < self.open_until:
+                return False
+            if self.open_until:
+                # Cooldown is over: start again with a clean window
+                self.open_until = 0.0
+                self.outcomes.clear()
+            return True
+
+    def record(self, success):
+        with self.lock:
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) == self.window and failures / self.window >= self.threshold:
+                self.open_until = time.time() + self.cooldown
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+def get_breaker(endpoint):
+    with breakers_lock:
+        if endpoint not in breakers:
+            breakers[endpoint] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_WINDOW, BREAKER_COOLDOWN)
+        return breakers[endpoint]
+
+def backoff_delay(attempt, retry_after=0.0):
+    # Exponential backoff with jitter, never shorter than the server's Retry-After
+    delay = RETRY_DELAY * (2 ** attempt)
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    return max(delay, retry_after)
+
+def backoff(attempt, retry_after=0.0):
+    delay = backoff_delay(attempt, retry_after)
+    metrics.inc("retry_backoff_seconds_total", delay)
+    time.sleep(delay)
+
+def workflow_runs_request(repo, since=None, page=1):
+    # Only ask for runs created inside the evaluation window
+    since = since or datetime.now().date()
+    query = urlencode({"created": f">={since.isoformat()}", "per_page": RUNS_PER_PAGE, "page": page})
+    url = f"{GITHUB_API_URL}/repos/{repo}/actions/runs?{query}"
+    return url, response_cache.get(url)
+
+def workflow_status_attempt(url, cached):
+    # Makes one request. Returns (result, retry_after), where retry_after is None once the result is final.
+    breaker = get_breaker("workflow_runs")
+    if not breaker.allow():
+        metrics.inc("circuit_breaker_rejections_total", endpoint="workflow_runs")
+        return None, None
+    headers = {"If-None-Match": cached["etag"]} if cached else None
+    try:
+        response = token_pool.make_request(url, headers=headers)
+    except requests.RequestException:
+        breaker.record(False)
+        metrics.inc("github_retries_total", reason="connection_error")
+        return None, 0.0
+    retry_after = float(response.headers.get("Retry-After", 0))
+    if is_rate_limited(response):
+        metrics.inc("github_retries_total", reason="rate_limited")
+        return None, retry_after  # The limiter also holds the next attempt until the limit clears
+    elif response.status_code >= 500 or response.status_code == 429:
+        breaker.record(False)
+        metrics.inc("github_retries_total", reason=f"status_{response.status_code}")
+        return None, retry_after
+    breaker.record(True)
+    if response.status_code == 304:
+        if cached is None:
+            # Not ours to answer: a request without If-None-Match cannot be Not Modified
+            metrics.inc("github_retries_total", reason="unexpected_304")
+            return None, 0.0
+        return cached["body"], None
+    elif response.status_code == 200:
+        body = response.json()
+        if response.headers.get("ETag"):
+            response_cache.put(url, response.headers["ETag"], body)
+        return body, None
+    elif response.status_code == 403:
+        return "Access Forbidden", None
+    elif response.status_code == 404:
+        return "Not Found", None
+    metrics.inc("github_retries_total", reason=f"status_{response.status_code}")
+    return None, retry_after
+
+def get_workflow_status(repo, since=None, page=1):
+    url, cached = workflow_runs_request(repo, since, page)
     for attempt in range(MAX_RETRIES):
-        response = rate_limiter.make_request(url)
+        result, retry_after = workflow_status_attempt(url, cached)
+        if retry_after is None:
+            return result
+        if attempt + 1 < MAX_RETRIES:
+            backoff(attempt, retry_after)
+    return None
+
+def fetch_repo_listing_page(path, page):
+    # One page of an owner's repositories; returns the response, or None when the owner does not exist
+    url = f"{GITHUB_API_URL}{path}?{urlencode({'per_page': REPOS_PER_PAGE, 'page': page})}"
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = token_pool.make_request(url)
+        except requests.RequestException:
+            backoff(attempt)
+            continue
         if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 403:
-            return "Access Forbidden"
+            return response
         elif response.status_code == 404:
-            return "Not Found"
-        else:
-            time.sleep(RETRY_DELAY * (2 ** attempt))  # Exponential backoff
+            return None
+        elif not is_rate_limited(response):
+            backoff(attempt, float(response.headers.get("Retry-After", 0)))
+    raise RuntimeError(f"Failed to list repositories at {path} after {MAX_RETRIES} attempts")
+
+def last_page(response):
+    last = response.links.get("last", {}).get("url")
+    return int(parse_qs(urlparse(last).query)["page"][0]) if last else 1
+
+def listed_repositories(responses):
+    # Archived and disabled repositories cannot have runs today, so drop them before any runs request
+    return [
+        item["full_name"]
+        for response in responses
+        for item in response.json()
+        if not item.get("archived") and not item.get("disabled")
+    ]
+
+def discovery_cache_path(owner):
+    return os.path.join(DISCOVERY_CACHE_DIR, hashlib.sha256(owner.lower().encode()).hexdigest()[:16] + ".json")
+
+def load_discovered(owner, stale=False):
+    try:
+        with open(discovery_cache_path(owner)) as cache_file:
+            entry = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if not stale and time.time() - entry["fetched_at"] > DISCOVERY_TTL:
+        return None
+    return entry["repositories"]
+
+def discovery_fallback(owner):
+    # A listing that keeps failing falls back to the last one stored, however old; None when there is none
+    metrics.inc("discovery_failures_total")
+    return load_discovered(owner, stale=True)
+
+def store_discovered(owner, repositories):
+    os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+    path = discovery_cache_path(owner)
+    with open(f"{path}.tmp", "w") as cache_file:
+        json.dump({"owner": owner, "fetched_at": time.time(), "repositories": repositories}, cache_file)
+    os.replace(f"{path}.tmp", path)
+
+def discover_owners(owners, max_workers=MAX_WORKERS):
+    # Lists every owner's repositories: first pages concurrently, then all remaining pages concurrently
+    listings = {}
+    for owner in owners:
+        cached = load_discovered(owner)
+        if cached is not None:
+            listings[owner] = cached
+    pending = [owner for owner in owners if owner not in listings]
+    if not pending:
+        return listings
+
+    def first_page(owner):
+        # Owners can be organizations or users
+        for path in (f"/orgs/{owner}/repos", f"/users/{owner}/repos"):
+            response = fetch_repo_listing_page(path, 1)
+            if response is not None:
+                return path, response
+        return None, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        first_futures = {owner: executor.submit(first_page, owner) for owner in pending}
+        first_pages = {}
+        for owner, future in first_futures.items():
+            try:
+                first_pages[owner] = future.result()
+            except RuntimeError:
+                listings[owner] = discovery_fallback(owner)
+        page_futures = {
+            owner: [executor.submit(fetch_repo_listing_page, path, page) for page in range(2, last_page(response) + 1)]
+            for owner, (path, response) in first_pages.items()
+            if response is not None
+        }
+        for owner, (path, response) in first_pages.items():
+            if response is None:
+                listings[owner] = []
+                continue
+            try:
+                responses = [response] + [future.result() for future in page_futures[owner]]
+            except RuntimeError:
+                listings[owner] = discovery_fallback(owner)
+                continue
+            listings[owner] = listed_repositories(response for response in responses if response is not None)
+            store_discovered(owner, listings[owner])
+    return listings
+
+def discovery_owner(entry):
+    # The owner to list for an `org:` entry or an `owner/*` glob pattern, or None for a plain repository
+    if isinstance(entry, dict):
+        return entry["org"]
+    if any(char in entry for char in "*?["):
+        return entry.split("/", 1)[0]
     return None
 
-# Rate limit decorator for Apprise notifications
-@sleep_and_retry
-@limits(calls=NOTIFICATIONS_PER_HOUR, period=3600)
+def discover_repositories(config):
+    # Returns a copy of the config with `org:` entries and glob patterns expanded to repository names.
+    # Owners that could not be listed, even from a stale cache, are kept in the project's "discovery_failed".
+    owners = sorted({
+        owner
+        for group in config.values()
+        for project in group["projects"].values()
+        for owner in map(discovery_owner, project["repositories"])
+        if owner
+    })
+    listings = discover_owners(owners) if owners else {}
+    expanded = {}
+    for group_key, group in config.items():
+        expanded[group_key] = dict(group, projects={})
+        for project_key, project in group["projects"].items():
+            repositories = []
+            failed = []
+            marked = []
+            for entry in project["repositories"]:
+                owner = discovery_owner(entry)
+                if owner is None:
+                    repositories.append(entry)
+                    if is_placeholder(entry):
+                        marked.append(entry)
+                elif listings[owner] is None:
+                    failed.append(owner)
+                elif isinstance(entry, dict):
+                    repositories.extend(listings[owner])
+                else:
+                    repositories.extend(repo for repo in listings[owner] if fnmatchcase(repo.lower(), entry.lower()))
+            expanded[group_key]["projects"][project_key] = dict(project, repositories=list(dict.fromkeys(repositories)), placeholders=marked)
+            if failed:
+                expanded[group_key]["projects"][project_key]["discovery_failed"] = list(dict.fromkeys(failed))
+    return expanded
+
+# One Apprise instance is shared by every notification in the run
+apprise_client = None
+apprise_lock = threading.Lock()
+
+def get_apprise_client():
+    global apprise_client
+    with apprise_lock:
+        if apprise_client is None:
+            apprise_client = apprise.Apprise()
+            apprise_client.add(DISCORD_WEBHOOK)
+        return apprise_client
+
+def notify_discord(content):
+    # Returns False when Apprise could not deliver the message
+    with metrics.timer("notification_send_seconds"):
+        return get_apprise_client().notify(body=content, title=NOTIFICATION_TITLE)
+
+# Rate limited wrapper for Apprise notifications, built on first use so ratelimit is imported lazily
+limited_notify_discord = None
+
+def deliver_discord_message(content):
+    global limited_notify_discord
+    with apprise_lock:
+        if limited_notify_discord is None:
+            limited_notify_discord = ratelimit.limits(calls=NOTIFICATIONS_PER_HOUR, period=3600)(notify_discord)
+    return limited_notify_discord(content)
+
 def send_discord_message(content):
-    apobj = apprise.Apprise()
-    apobj.add(DISCORD_WEBHOOK)
-    apobj.notify(body=content, title="GitHub Action Notification")
+    # Same as ratelimit's sleep_and_retry, but records the time spent blocked on the limiter
+    while True:
+        try:
+            return deliver_discord_message(content)
+        except ratelimit.RateLimitException as exception:
+            metrics.inc("limiter_blocked_seconds_total", exception.period_remaining, limiter="notifications")
+            time.sleep(exception.period_remaining)
+
+def split_block(block, limit):
+    # Split an oversized block on line boundaries, hard-wrapping any single long line
+    pieces = []
+    current = ""
+    for line in block.splitlines(keepends=True):
+        while len(line) > limit:
+            pieces.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_digest(blocks, limit=DIGEST_CHUNK_SIZE):
+    # Pack whole blocks into as few messages as possible without exceeding the limit
+    chunks = []
+    current = ""
+    for block in blocks:
+        for piece in [block] if len(block) <= limit else split_block(block, limit):
+            if current and len(current) + len(piece) + 1 > limit:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def build_digest(results):
+    # Render the records and group each project's messages under its group heading
+    by_project = {}
+    for result in results:
+        by_project.setdefault((result.group, result.project), []).extend(render_result(result))
+    by_group = {}
+    for (group_name, project_name), messages in by_project.items():
+        by_group.setdefault(group_name, []).append("\n".join(messages))
+    blocks = []
+    for group_name, project_blocks in by_group.items():
+        blocks.append(f"**{group_name}**\n{project_blocks[0]}")
+        blocks.extend(project_blocks[1:])
+    return chunk_digest(blocks)
+
+def send_digest(results):
+    # Scenarios only count as notified once the whole digest went out, so a failed send is retried next sweep
+    delivered = True
+    for chunk in build_digest(results):
+        delivered = bool(send_discord_message(chunk)) and delivered
+    if delivered and state_store is not None:
+        state_store.mark_notified(
+            [(notification_subject(result.group, result.project, result.repo), result.scenario) for result in results],
+            datetime.now().date(),
+        )
+    return delivered
+
+class IncompleteRunsError(RuntimeError):
+    # A later page of runs could not be fetched, so the runs seen so far are not the whole day
+    pass
+
+def iter_workflow_runs(repo, workflows, since):
+    # Lazily walk the run pages (newest first), stopping once runs fall before the window.
+    # Raises IncompleteRunsError when a later page cannot be fetched.
+    since_prefix = since.isoformat()
+    page = 1
+    seen = 0
+    while True:
+        for run in workflows["workflow_runs"]:
+            if run["created_at"] < since_prefix:
+                return
+            yield run
+        seen += len(workflows["workflow_runs"])
+        if not workflows["workflow_runs"] or seen >= workflows.get("total_count", 0):
+            return
+        page += 1
+        workflows = get_workflow_status(repo, since, page)
+        if not isinstance(workflows, dict):
+            raise IncompleteRunsError(f"Page {page} of the workflow runs of {repo} could not be fetched")
 
-def append_custom_message(messages, scenario_key):
-    if CUSTOM_MESSAGES and CUSTOM_MESSAGES["enable_custom_messages"] and CUSTOM_MESSAGES["scenarios"].get(scenario_key, {}).get("enabled", False):
-        custom_message = CUSTOM_MESSAGES["scenarios"][scenario_key].get("message", "")
-        if custom_message:
-            messages.append(custom_message)
+def is_placeholder(repo):
+    return "username" in repo or "repo" in repo
 
-def check_project_workflows(group_name, project_name, project):
+def placeholders(project):
+    # Hand-written placeholder entries, marked by discover_repositories before expansion so that
+    # discovered names (e.g. acme/reporting) are never mistaken for one
+    if "placeholders" in project:
+        return project["placeholders"]
+    return [repo for repo in project["repositories"] if is_placeholder(repo)]
+
+def checked_repositories(project):
+    skipped = placeholders(project)
+    return [repo for repo in project["repositories"] if repo not in skipped]
+
+@dataclass(slots=True, frozen=True)
+class Result:
+    group: str
+    project: str
+    repo: str | None  # None for project-level scenarios
+    scenario: str
+    run_id: int | None = None
+    detail: str | None = None  # Failing step and log tail, filled in by the drill-down
+
+RESULT_FIELDS = ("group", "project", "repo", "scenario", "run_id", "detail")
+
+# How each scenario is reported in Discord
+SCENARIO_MESSAGES = {
+    "placeholder_detected": "Placeholder values detected for {repo} in {project} ({group}). Skipping actual check.\n",
+    "access_forbidden": "Access to {repo} in {project} ({group}) is forbidden (likely private, suspended, or flagged).\n",
+    "actions_disabled": "Actions are disabled for {repo} in {project} ({group}). Unable to check workflow status.\n",
+    "workflow_failed": "Workflow run for {repo} in {project} ({group}) concluded with failure today.\n",
+    "workflow_timed_out": "Workflow run for {repo} in {project} ({group}) concluded with timed out today.\n",
+    "workflow_cancelled": "Workflow run for {repo} in {project} ({group}) concluded with cancelled today.\n",
+    "no_workflows_triggered": "No workflows have been triggered for {repo} in {project} ({group}) today.\n",
+    "failed_fetch": "Failed to fetch workflow for {repo} in {project} ({group}) after {max_retries} attempts.\n",
+    "discovery_failed": "Failed to list the repositories of {repo} for {project} ({group}) after {max_retries} attempts.\n",
+    "both_actions_disabled": "Both accounts have their Actions disabled in {project} ({group}).\n",
+    "both_accounts_issues": "No workflows have completed for both accounts in {project} ({group}) today.\n",
+    "no_successful_workflow": "No successful workflow run for {repo} in {project} ({group}) today.\n",
+}
+
+def build_custom_message_table(custom_messages):
+    # Scenario -> extra message, resolved once instead of for every result
+    if not custom_messages or not custom_messages["enable_custom_messages"]:
+        return {}
+    return {
+        scenario: settings["message"]
+        for scenario, settings in custom_messages["scenarios"].items()
+        if settings.get("enabled", False) and settings.get("message")
+    }
+
+CUSTOM_MESSAGE_TABLE = build_custom_message_table(CUSTOM_MESSAGES)
+
+def render_result(result):
+    messages = [SCENARIO_MESSAGES[result.scenario].format(
+        repo=result.repo, project=result.project, group=result.group, max_retries=MAX_RETRIES)]
+    if result.detail:
+        messages.append(result.detail)
+    if result.scenario in CUSTOM_MESSAGE_TABLE:
+        messages.append(CUSTOM_MESSAGE_TABLE[result.scenario])
+    return messages
+
+class ReportWriter:
+    # Streams result records to a JSONL or CSV file, picked by the file extension
+    def __init__(self, path, append=False):
+        self.csv = path.endswith(".csv")
+        write_header = self.csv and not (append and os.path.exists(path) and os.path.getsize(path))
+        self.file = open(path, "a" if append else "w", newline="")
+        if self.csv:
+            self.writer = csv.writer(self.file)
+            if write_header:
+                self.writer.writerow(RESULT_FIELDS)
+
+    def write(self, results):
+        for result in results:
+            if self.csv:
+                self.writer.writerow([getattr(result, field) for field in RESULT_FIELDS])
+            else:
+                self.file.write(json.dumps({field: getattr(result, field) for field in RESULT_FIELDS}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def open_report(append=False):
+    return ReportWriter(REPORT_FILE, append) if REPORT_FILE else None
+
+CONCLUSION_SCENARIOS = {
+    "failure": "workflow_failed",
+    "timed_out": "workflow_timed_out",
+    "cancelled": "workflow_cancelled",
+}
+
+# Separate, capped budget so drill-down never competes with the sweep for requests
+drill_down_limiter = RateLimiter(DRILL_DOWN_BUDGET, RESET_TIME) if DRILL_DOWN_BUDGET else None
+
+# Scenarios worth a look at the failing step
+DRILL_DOWN_SCENARIOS = {"workflow_failed", "workflow_timed_out"}
+
+LOG_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}T[\d:.]+Z ")
+
+def drill_down_request(url, headers=None, stream=False):
+    # Returns None once the drill-down budget or the sweep's reserve is used up
+    if token_pool.remaining() < DRILL_DOWN_RESERVE or not drill_down_limiter.try_acquire():
+        metrics.inc("drill_down_skipped_total")
+        return None
+    return token_pool.make_request(url, headers=headers, stream=stream)
+
+def find_failing_step(repo, run_id):
+    # Returns (job, step) for the first failing job of the run, step being None when no step is marked
+    response = drill_down_request(f"{GITHUB_API_URL}/repos/{repo}/actions/runs/{run_id}/jobs?{urlencode({'filter': 'latest', 'per_page': 100})}")
+    if response is None or response.status_code != 200:
+        return None, None
+    jobs = response.json().get("jobs", [])
+    for conclusion in DRILL_DOWN_CONCLUSIONS:
+        for job in jobs:
+            if job.get("conclusion") == conclusion:
+                steps = job.get("steps") or []
+                for step_conclusion in DRILL_DOWN_CONCLUSIONS:
+                    step = next((step for step in steps if step.get("conclusion") == step_conclusion), None)
+                    if step:
+                        return job, step
+                return job, None
+    return None, None
+
+def fetch_log_tail(repo, job_id):
+    # Streams only the end of the job log; whatever the server sends, at most DRILL_DOWN_LOG_BYTES are kept
+    response = drill_down_request(f"{GITHUB_API_URL}/repos/{repo}/actions/jobs/{job_id}/logs",
+                                  headers={"Range": f"bytes=-{DRILL_DOWN_LOG_BYTES}"}, stream=True)
+    if response is None:
+        return None
+    try:
+        if response.status_code not in (200, 206):
+            return None
+        tail = bytearray()
+        for chunk in response.iter_content(chunk_size=8192):
+            tail += chunk
+            if len(tail) > DRILL_DOWN_LOG_BYTES:
+                del tail[:-DRILL_DOWN_LOG_BYTES]
+    finally:
+        response.close()
+    lines = tail.decode("utf-8", errors="replace").splitlines()
+    if response.status_code == 206 or len(tail) == DRILL_DOWN_LOG_BYTES:
+        lines = lines[1:]  # The first line is probably cut
+    lines = [LOG_TIMESTAMP.sub("", line)[:DRILL_DOWN_LINE_LENGTH] for line in lines if line.strip()]
+    return lines[-DRILL_DOWN_LOG_LINES:]
+
+def describe_failure(repo, run_id):
+    try:
+        job, step = find_failing_step(repo, run_id)
+        if job is None:
+            return None
+        detail = f"Failing step: {job.get('name')}" + (f" / {step.get('name')}" if step else "")
+        lines = fetch_log_tail(repo, job["id"])
+    except (requests.RequestException, ValueError):
+        metrics.inc("drill_down_errors_total")
+        return None
+    metrics.inc("drill_down_total")
+    if lines:
+        # Keep log lines from closing the code block early
+        detail += "\n```\n" + "\n".join(lines).replace("```", "` ` `") + "\n```"
+    return detail
+
+def drill_down(results, executor):
+    # Adds the failing step and log tail to the newest flagged run of each repository.
+    # The lookups run on the sweep's executor and are joined before returning.
+    if drill_down_limiter is None:
+        return results
+    lookups = {}
+    for index, result in enumerate(results):
+        if result.scenario in DRILL_DOWN_SCENARIOS and result.run_id and result.repo not in lookups:
+            lookups[result.repo] = (index, executor.submit(describe_failure, result.repo, result.run_id))
+    detailed = list(results)
+    for index, future in lookups.values():
+        detail = future.result()
+        if detail:
+            detailed[index] = replace(detailed[index], detail=detail)
+    return detailed
+
+GRAPHQL_RUNS_FRAGMENT = """
+fragment runs on Repository {
+  defaultBranchRef {
+    target {
+      ... on Commit {
+        checkSuites(last: %d, filterBy: {appId: %d}) {
+          nodes { status conclusion createdAt workflowRun { databaseId createdAt updatedAt } }
+        }
+      }
+    }
+  }
+}
+""" % (GRAPHQL_SUITES_PER_REPO, ACTIONS_APP_ID)
+
+def graphql_runs_query(repos):
+    # One aliased repository field per repo, plus the query's own point cost
+    fields = []
+    for index, repo in enumerate(repos):
+        owner, name = repo.split("/", 1)
+        fields.append(f"  r{index}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ ...runs }}")
+    return "query {\n  rateLimit { cost remaining }\n" + "\n".join(fields) + "\n}\n" + GRAPHQL_RUNS_FRAGMENT
+
+# Points the server reported for the last query of each batch size
+graphql_costs = {}
+
+def graphql_query_cost(batch_size):
+    # Until the server has reported a cost: GitHub counts the connection requests a query may make
+    # (one checkSuites connection per repository here), divided by 100, at least one point
+    return graphql_costs.get(batch_size, max(1, -(-batch_size // 100)))
+
+def normalize_check_suites(suites, today):
+    # Same shape as the REST workflow runs listing, newest first, limited to today's runs
+    runs = [
+        {
+            "id": suite["workflowRun"]["databaseId"],
+            "created_at": suite["workflowRun"]["createdAt"],
+            "updated_at": suite["workflowRun"]["updatedAt"],
+            "status": (suite["status"] or "").lower(),
+            "conclusion": (suite["conclusion"] or "").lower() or None,
+        }
+        for suite in suites
+        if suite.get("workflowRun") and suite["workflowRun"]["createdAt"].startswith(today.isoformat())
+    ]
+    runs.sort(key=lambda run: (run["created_at"], run["id"]), reverse=True)
+    return {"total_count": len(runs), "workflow_runs": runs}
+
+def graphql_fetch_batch(repos, today):
+    # Returns normalized runs for the repos the query settled; anything else is left to REST
+    try:
+        response = token_pool.graphql(graphql_runs_query(repos), graphql_query_cost(len(repos)))
+        if response is None or response.status_code != 200:
+            return {}
+        data = response.json().get("data") or {}
+    except (requests.RequestException, ValueError):
+        metrics.inc("graphql_errors_total")
+        return {}
+    if data.get("rateLimit"):
+        graphql_costs[len(repos)] = data["rateLimit"]["cost"]
+        metrics.inc("graphql_points_total", data["rateLimit"]["cost"])
+    resolved = {}
+    for index, repo in enumerate(repos):
+        target = ((data.get(f"r{index}") or {}).get("defaultBranchRef") or {}).get("target") or {}
+        if "checkSuites" not in target:
+            continue  # Missing, forbidden or empty repository
+        workflows = normalize_check_suites(target["checkSuites"]["nodes"], today)
+        # Only the default branch head is visible here, so only a success today settles the repo.
+        # Failures newer than that success elsewhere are missed; this is what makes the mode lossy.
+        if any(run["conclusion"] == "success" for run in workflows["workflow_runs"]):
+            resolved[repo] = workflows
+    metrics.inc("graphql_resolved_total", len(resolved))
+    return resolved
+
+def graphql_prefetch(repos, today, executor):
+    batches = [repos[index:index + GRAPHQL_BATCH_SIZE] for index in range(0, len(repos), GRAPHQL_BATCH_SIZE)]
+    prefetched = {}
+    for resolved in executor.map(graphql_fetch_batch, batches, itertools.repeat(today)):
+        prefetched.update(resolved)
+    return prefetched
+
+def evaluate_repo(repo, workflows, today, state=None):
+    # Project-agnostic verdict: the (scenario, run ID) pairs hit today and whether a run succeeded.
+    # With a stored state only runs updated since the last sweep are evaluated, and the state is updated in place.
+    # Runs are compared by updated_at, not ID, because a re-run keeps its ID.
+    # The state keeps the day's run scenarios, so they are reported again until a digest with them is delivered.
+    seen_scenarios = [tuple(pair) for pair in state["scenarios"]] if state else []
+    if workflows == "Access Forbidden":
+        return seen_scenarios + [("access_forbidden", None)], False
+    elif workflows == "Not Found":
+        return seen_scenarios + [("actions_disabled", None)], False
+    elif not workflows:
+        return seen_scenarios + [("failed_fetch", None)], False
+    today_prefix = today.isoformat()
+    last_updated_at = state["last_updated_at"] if state else None
+    newest_updated_at = last_updated_at
+    new_scenarios = []
+    evaluated_ids = set()
+    workflow_triggered_today = bool(state and state["triggered"])
+    complete = False
+    try:
+        for run in iter_workflow_runs(repo, workflows, today):
+            # Runs still in progress get a newer updated_at when they finish, so they are looked at again then
+            updated_at = run.get("updated_at") or run["created_at"]
+            if last_updated_at is not None and updated_at <= last_updated_at:
+                continue  # Unchanged since an earlier sweep
+            newest_updated_at = max(newest_updated_at or updated_at, updated_at)
+            evaluated_ids.add(run["id"])
+            if run["created_at"].startswith(today_prefix):
+                workflow_triggered_today = True
+                if run["conclusion"] == "success":
+                    complete = True
+                    break
+                elif run["conclusion"] in CONCLUSION_SCENARIOS:
+                    new_scenarios.append((CONCLUSION_SCENARIOS[run["conclusion"]], run["id"]))
+    except IncompleteRunsError:
+        # A partial listing could yield a false verdict, so report the fetch and leave the state untouched
+        return seen_scenarios + [("failed_fetch", None)], False
+    # A re-run replaces what its earlier attempt reported, and each (scenario, run ID) pair is kept once
+    scenarios = list(dict.fromkeys([pair for pair in seen_scenarios if pair[1] not in evaluated_ids] + new_scenarios))
+    if state is not None:
+        state["scenarios"] = list(scenarios)
+    if not workflow_triggered_today:
+        scenarios.append(("no_workflows_triggered", None))
+    if state is not None:
+        state["triggered"] = workflow_triggered_today
+        state["success"] = complete
+        state["last_updated_at"] = newest_updated_at
+    return scenarios, complete
+
+def load_repo_state(repo, today):
+    return state_store.load(repo, today) if state_store is not None else None
+
+def evaluate_and_store(repo, workflows, today, state):
+    if snapshot_recorder is not None:
+        workflows = snapshot_recorder.record(repo, workflows, today)
+    scenarios, complete = evaluate_repo(repo, workflows, today, state)
+    if state is not None:
+        state_store.save(repo, today, state)
+    return scenarios, complete
+
+def passed_today(state):
+    # The stored verdict of a repository that already passed today, or None when it still needs an API call
+    return (state["scenarios"], True) if state and state["success"] else None
+
+# Snapshot entries keep the status code; the body is only stored for 200 responses
+SNAPSHOT_STATUS = {"Access Forbidden": 403, "Not Found": 404}
+SNAPSHOT_RESULTS = {403: "Access Forbidden", 404: "Not Found"}
+SNAPSHOT_RUN_FIELDS = ("id", "created_at", "updated_at", "status", "conclusion")
+
+class SnapshotRecorder:
+    # Appends each repository's workflow runs response to a gzip JSONL snapshot as soon as it is fetched
+    def __init__(self, path, config, today):
+        self.file = gzip.open(path, "wt", compresslevel=6)
+        self.lock = threading.Lock()
+        self._write({"date": today.isoformat(), "config": config})
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.file.write(line)
+
+    def record(self, repo, workflows, today):
+        # All pages are read now, so a replay never needs the network to continue pagination
+        if isinstance(workflows, dict):
+            try:
+                runs = [{field: run.get(field) for field in SNAPSHOT_RUN_FIELDS} for run in iter_workflow_runs(repo, workflows, today)]
+            except IncompleteRunsError:
+                self._write({"repo": repo, "status": None, "body": None})
+                return None
+            workflows = {"total_count": len(runs), "workflow_runs": runs}
+            self._write({"repo": repo, "status": 200, "body": workflows})
+        else:
+            self._write({"repo": repo, "status": SNAPSHOT_STATUS.get(workflows), "body": None})  # No status: failed fetch
+        return workflows
+
+    def close(self):
+        self.file.close()
+
+snapshot_recorder = None
+
+def iter_snapshot(path):
+    # Streams a snapshot line by line: the header first, then one entry per repository
+    with gzip.open(path, "rt") as snapshot:
+        for line in snapshot:
+            yield json.loads(line)
+
+class RetryScheduler:
+    # Hands callbacks to the executor once their delay has passed, so waiting retries hold no worker
+    def __init__(self, executor):
+        self.executor = executor
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, delay, fn, *args):
+        with self.condition:
+            heapq.heappush(self.heap, (time.monotonic() + delay, next(self.counter), fn, args))
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.closed and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    self.condition.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                if self.closed:
+                    return
+                _, _, fn, args = heapq.heappop(self.heap)
+            self.executor.submit(fn, *args)
+
+class RepoCheck:
+    # Fetches and evaluates one repository, re-queuing retries on the scheduler instead of sleeping
+    def __init__(self, repo, today, executor, scheduler, prefetched=None):
+        self.repo = repo
+        self.today = today
+        self.executor = executor
+        self.scheduler = scheduler
+        self.prefetched = prefetched  # Runs already fetched by the GraphQL backend
+        self.future = Future()
+        self.started = time.perf_counter()
+        self.state = None
+        self.url = None
+        self.cached = None
+
+    def start(self):
+        self.executor.submit(self.attempt, 0)
+        return self.future
+
+    def attempt(self, number):
+        try:
+            if number == 0:
+                self.state = load_repo_state(self.repo, self.today)
+                evaluation = passed_today(self.state)
+                if evaluation is not None:
+                    return self.finish(evaluation)
+                if self.prefetched is not None:
+                    return self.finish(evaluate_and_store(self.repo, self.prefetched, self.today, self.state))
+                self.url, self.cached = workflow_runs_request(self.repo, self.today)
+            workflows, retry_after = workflow_status_attempt(self.url, self.cached)
+            if retry_after is not None and number + 1 < MAX_RETRIES:
+                delay = backoff_delay(number, retry_after)
+                metrics.inc("retry_backoff_seconds_total", delay)
+                self.scheduler.schedule(delay, self.attempt, number + 1)
+                return
+            self.finish(evaluate_and_store(self.repo, workflows, self.today, self.state))
+        except Exception as exception:
+            self.future.set_exception(exception)
+
+    def finish(self, evaluation):
+        metrics.observe("repo_evaluation_seconds", time.perf_counter() - self.started)
+        self.future.set_result(evaluation)
+
+class SweepMemo:
+    # Per-sweep single-flight memo: every lookup of a key shares one started task
+    def __init__(self):
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, start, *args):
+        with self.lock:
+            if key not in self.futures:
+                self.futures[key] = start(*args)
+            return self.futures[key]
+
+# Scenarios about runs that have not happened yet, only final once the day is over
+MISSING_RUN_SCENARIOS = {"no_workflows_triggered", "both_accounts_issues", "no_successful_workflow"}
+
+def notification_subject(group_name, project_name, repo=None):
+    return f"{group_name}/{project_name}/{repo}" if repo else f"{group_name}/{project_name}"
+
+def check_project_workflows(group_name, project_name, project, evaluations):
     today = datetime.now().date()
+    end_of_day = datetime.now().hour >= END_OF_DAY_HOUR
     project_complete = {repo: False for repo in project["repositories"]}
-    messages = []
+    results = []
+    reported = set()
     actions_disabled_count = 0  # To track actions disabled state
 
+    def report(scenario, repo=None, run_id=None):
+        # In incremental mode each scenario is reported once per day, and missing runs only at the end of the day
+        if state_store is not None:
+            if scenario in MISSING_RUN_SCENARIOS and not end_of_day:
+                return
+            subject = notification_subject(group_name, project_name, repo)
+            if (subject, scenario) in reported or state_store.is_notified(subject, scenario, today):
+                return
+            reported.add((subject, scenario))
+        results.append(Result(group_name, project_name, repo, scenario, run_id))
+
+    for owner in project.get("discovery_failed", []):
+        report("discovery_failed", owner)
+
+    skipped = placeholders(project)
     for repo in project["repositories"]:
-        if "username" in repo or "repo" in repo:
-            messages.append(f"Placeholder values detected for {repo} in {project_name} ({group_name}). Skipping actual check.\n")
-            append_custom_message(messages, "placeholder_detected")
-            continue
-        workflows = get_workflow_status(repo)
-        if workflows == "Access Forbidden":
-            messages.append(f"Access to {repo} in {project_name} ({group_name}) is forbidden (likely private, suspended, or flagged).\n")
-            append_custom_message(messages, "access_forbidden")
-            continue
-        elif workflows == "Not Found":
-            actions_disabled_count += 1
-            messages.append(f"Actions are disabled for {repo} in {project_name} ({group_name}). Unable to check workflow status.\n")
-            append_custom_message(messages, "actions_disabled")
-            continue
-        elif workflows:
-            workflow_triggered_today = False
-            for run in workflows["workflow_runs"]:
-                run_date = datetime.strptime(run["created_at"], "%Y-%m-%dT%H:%M:%SZ").date()
-                if run_date == today:
-                    workflow_triggered_today = True
-                    if run["conclusion"] == "success":
-                        project_complete[repo] = True
-                        break
-                    elif run["conclusion"] == "failure":
-                        messages.append(f"Workflow run for {repo} in {project_name} ({group_name}) concluded with failure today.\n")
-                        append_custom_message(messages, "workflow_failed")
-                    elif run["conclusion"] == "timed_out":
-                        messages.append(f"Workflow run for {repo} in {project_name} ({group_name}) concluded with timed out today.\n")
-                        append_custom_message(messages, "workflow_timed_out")
-                    elif run["conclusion"] == "cancelled":
-                        messages.append(f"Workflow run for {repo} in {project_name} ({group_name}) concluded with cancelled today.\n")
-                        append_custom_message(messages, "workflow_cancelled")
-            if not workflow_triggered_today:
-                messages.append(f"No workflows have been triggered for {repo} in {project_name} ({group_name}) today.\n")
-                append_custom_message(messages, "no_workflows_triggered")
-        else:
-            messages.append(f"Failed to fetch workflow for {repo} in {project_name} ({group_name}) after {MAX_RETRIES} attempts.\n")
-            append_custom_message(messages, "failed_fetch")
+        if repo in skipped:
+            report("placeholder_detected", repo)
             continue
+        scenarios, complete = evaluations[repo]
+        project_complete[repo] = complete
+        for scenario, run_id in scenarios:
+            if scenario == "actions_disabled":
+                actions_disabled_count += 1
+            report(scenario, repo, run_id)
 
     ## Separate Section for Custom Messages Handling ##
-    if actions_disabled_count == len(project["repositories"]):
-        messages.append(f"Both accounts have their Actions disabled in {project_name} ({group_name}).\n")
-        append_custom_message(messages, "both_actions_disabled")
+    if project["repositories"] and actions_disabled_count == len(project["repositories"]):
+        report("both_actions_disabled")
 
     if not all(project_complete.values()):
         if all(not status for status in project_complete.values()):
-            messages.append(f"No workflows have completed for both accounts in {project_name} ({group_name}) today.\n")
-            append_custom_message(messages, "both_accounts_issues")
+            report("both_accounts_issues")
         else:
             for repo, status in project_complete.items():
                 if not status:
-                    messages.append(f"No successful workflow run for {repo} in {project_name} ({group_name}) today.\n")
-                    append_custom_message(messages, "no_successful_workflow")
+                    report("no_successful_workflow", repo)
     ## End of Custom Messages Section ##
 
-    if messages:
-        send_discord_message("\n".join(messages))
+    return results
+
+def iter_repositories(config):
+    for group in config.values():
+        for project in group["projects"].values():
+            yield from checked_repositories(project)
+
+def in_shard(repo, shard):
+    # Deterministic across processes and runners, unlike the built-in hash()
+    index, count = shard
+    return int(hashlib.sha256(repo.encode()).hexdigest()[:8], 16) % count == index - 1
+
+def start_fleet_checks(config, today, executor, scheduler, shard=None, skip=frozenset()):
+    # One check per unique repository, shared by every project that lists it
+    repos = [repo for repo in iter_repositories(config) if (shard is None or in_shard(repo, shard)) and repo not in skip]
+    prefetched = {}
+    if FETCH_BACKEND == "graphql":
+        pending = [repo for repo in dict.fromkeys(repos) if passed_today(load_repo_state(repo, today)) is None]
+        prefetched = graphql_prefetch(pending, today, executor)
+    memo = SweepMemo()
+    start_check = lambda repo: RepoCheck(repo, today, executor, scheduler, prefetched.get(repo)).start()
+    return {repo: memo.get(repo, start_check, repo) for repo in repos}
+
+def check_fleet(config, lookup, executor=None):
+    # Fan in per project once all of its repositories have been evaluated, streaming records to the report.
+    # Failed runs are drilled into on the executor when one is given.
+    results = []
+    report = open_report()
+    # Every repository task has been submitted by now, so this is when each project's checks started
+    checks_start = time.perf_counter()
+    try:
+        for group in config.values():
+            for project in group["projects"].values():
+                evaluations = {repo: lookup(repo) for repo in checked_repositories(project)}
+                project_results = check_project_workflows(group["name"], project["name"], project, evaluations)
+                metrics.observe("project_check_seconds", time.perf_counter() - checks_start)
+                if executor is not None:
+                    project_results = drill_down(project_results, executor)
+                if report:
+                    report.write(project_results)
+                results.extend(project_results)
+    finally:
+        if report:
+            report.close()
+    return results
+
+def finish_sweep(today, sweep_start):
+    response_cache.evict()
+    if state_store is not None:
+        state_store.prune(today)
+    metrics.set("sweep_seconds", time.perf_counter() - sweep_start)
+    if METRICS_DIR:
+        metrics.export(METRICS_DIR)
+
+def run_sweep(config, max_workers=MAX_WORKERS, notify=True):
+    today = datetime.now().date()
+    sweep_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scheduler = RetryScheduler(executor)
+        try:
+            futures = start_fleet_checks(config, today, executor, scheduler)
+            results = check_fleet(config, lambda repo: futures[repo].result(), executor)
+        finally:
+            scheduler.close()
+
+    if notify:
+        send_digest(results)
+    finish_sweep(today, sweep_start)
+    return results
+
+def record_sweep(config, path, max_workers=MAX_WORKERS, notify=True):
+    # A normal sweep that also writes every fetched response to a snapshot
+    global snapshot_recorder
+    snapshot_recorder = SnapshotRecorder(path, config, datetime.now().date())
+    try:
+        return run_sweep(config, max_workers, notify)
+    finally:
+        snapshot_recorder.close()
+        snapshot_recorder = None
+
+def replay_snapshot(path):
+    # Re-evaluates a recorded sweep offline; only the compact evaluations are kept while streaming
+    entries = iter_snapshot(path)
+    header = next(entries)
+    today = datetime.fromisoformat(header["date"]).date()
+    evaluations = {}
+    for entry in entries:
+        workflows = entry["body"] if entry["status"] == 200 else SNAPSHOT_RESULTS.get(entry["status"])
+        evaluations[entry["repo"]] = evaluate_repo(entry["repo"], workflows, today)
+    # No executor is passed, so replay never drills down over the network
+    return check_fleet(header["config"], lambda repo: evaluations.get(repo, ([("failed_fetch", None)], False)))
+
+def evaluate_shard(config, shard, max_workers=MAX_WORKERS, in_pool=False):
+    # Evaluates only this shard's repositories and returns partial results for a later merge
+    today = datetime.now().date()
+    sweep_start = time.perf_counter()
+    if in_pool:
+        metrics.reset()  # A worker process may run several shards
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scheduler = RetryScheduler(executor)
+        try:
+            futures = start_fleet_checks(config, today, executor, scheduler, shard)
+            evaluations = {repo: future.result() for repo, future in futures.items()}
+        finally:
+            scheduler.close()
+
+    partial = {"date": today.isoformat(), "shard": list(shard), "evaluations": evaluations}
+    if in_pool:
+        # The parent evicts, prunes and exports once for every process, with this process's metrics merged in
+        partial["metrics"] = metrics.summary()
+    else:
+        finish_sweep(today, sweep_start)
+    return partial
+
+def merge_partials(config, partials, notify=True):
+    today = datetime.now().date()
+    sweep_start = time.perf_counter()
+    evaluations = {}
+    for partial in partials:
+        evaluations.update(partial["evaluations"])
+        if "metrics" in partial:
+            metrics.merge(partial["metrics"])
+    # A repository missing from every shard (e.g. a failed job) is reported as a failed fetch
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = check_fleet(config, lambda repo: evaluations.get(repo, ([("failed_fetch", None)], False)), executor)
+    if notify:
+        send_digest(results)
+    finish_sweep(today, sweep_start)
+    return results
+
+def merge_shards(config, paths, notify=True):
+    partials = []
+    for path in paths:
+        with open(path) as partial_file:
+            partials.append(json.load(partial_file))
+    return merge_partials(config, partials, notify)
+
+def run_sweep_processes(config, processes, max_workers=MAX_WORKERS, notify=True):
+    import multiprocessing  # Only needed in this mode, and slow to import
+    from concurrent.futures import ProcessPoolExecutor
+
+    shards = [(index, processes) for index in range(1, processes + 1)]
+    # Spawned, not forked: a forked worker would share the parent's keep-alive sockets and SQLite connection
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        partials = list(pool.map(evaluate_shard, itertools.repeat(config), shards,
+                                 itertools.repeat(max_workers), itertools.repeat(True)))
+    return merge_partials(config, partials, notify)
+
+class Watcher:
+    # Keeps every repository on its own polling schedule in a priority queue ordered by next poll time
+    def __init__(self, config):
+        self.config = config
+        self.projects_by_repo = {}
+        for group in config.values():
+            for project in group["projects"].values():
+                for repo in checked_repositories(project):
+                    self.projects_by_repo.setdefault(repo, []).append((group, project))
+        self.intervals = {repo: WATCH_BASE_INTERVAL for repo in self.projects_by_repo}
+        self.run_hours = {repo: set() for repo in self.projects_by_repo}  # UTC hours the repo's runs usually start
+        self.evaluations = {}
+        self.heap = [(time.time(), repo) for repo in self.projects_by_repo]
+        heapq.heapify(self.heap)
+        # Polling shares the API budget with everything else, so it gets its own pacing limiter
+        quota = RATE_LIMIT * len(token_pool.credentials) if token_pool.credentials else UNAUTHENTICATED_RATE_LIMIT
+        self.limiter = RateLimiter(max(int(quota * WATCH_BUDGET_FRACTION), 1), RESET_TIME)
+        self.lock = threading.Lock()
+
+    def new_day(self):
+        # Yesterday's evaluations must not count toward today's report, and the backoff starts over
+        with self.lock:
+            self.evaluations.clear()
+            self.intervals = {repo: WATCH_BASE_INTERVAL for repo in self.projects_by_repo}
+
+    def pop_due(self):
+        now = time.time()
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                due.append(heapq.heappop(self.heap)[1])
+        return due
+
+    def seconds_until_next(self):
+        with self.lock:
+            return max(self.heap[0][0] - time.time(), 0) if self.heap else WATCH_MAX_INTERVAL
+
+    def poll(self, repo, today):
+        state = load_repo_state(repo, today)
+        evaluation = passed_today(state)
+        if evaluation is None:
+            self.limiter.check_limit()
+            workflows = get_workflow_status(repo, today)
+            evaluation = evaluate_and_store(repo, workflows, today, state)
+            if isinstance(workflows, dict):
+                self.run_hours[repo].update(int(run["created_at"][11:13]) for run in workflows["workflow_runs"])
+        metrics.inc("watch_polls_total")
+        self.evaluations[repo] = evaluation
+        self.reschedule(repo, evaluation)
+        return evaluation
+
+    def reschedule(self, repo, evaluation):
+        scenarios, complete = evaluation
+        now = datetime.now()
+        if complete:
+            # Nothing more to learn today; look again shortly after midnight
+            next_poll = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()).timestamp() + WATCH_MIN_INTERVAL
+        else:
+            utc_hour = datetime.now(timezone.utc).hour
+            usual_time = any((utc_hour - hour) % 24 in (0, 1, 23) for hour in self.run_hours[repo])
+            if usual_time or any(scenario in CONCLUSION_SCENARIOS.values() or scenario == "failed_fetch" for scenario, _ in scenarios):
+                self.intervals[repo] = WATCH_MIN_INTERVAL
+            else:
+                self.intervals[repo] = min(self.intervals[repo] * 2, WATCH_MAX_INTERVAL)
+            next_poll = time.time() + self.intervals[repo]
+        with self.lock:
+            heapq.heappush(self.heap, (next_poll, repo))
+
+    def report(self, repos):
+        # Re-checks only the projects that contain a freshly polled repository
+        results = []
+        seen = set()
+        for repo in repos:
+            for group, project in self.projects_by_repo[repo]:
+                if id(project) in seen:
+                    continue
+                seen.add(id(project))
+                evaluations = {other: self.evaluations.get(other, ([], False)) for other in checked_repositories(project)}
+                results.extend(check_project_workflows(group["name"], project["name"], project, evaluations))
+        return results
+
+def run_watch(config, max_workers=MAX_WORKERS, stop=None):
+    global state_store
+    if state_store is None:
+        state_store = StateStore(":memory:")  # Watch mode always needs per-day dedupe of notifications
+    stop = stop or threading.Event()
+    watcher = Watcher(config)
+    today = datetime.now().date()
+    report = open_report(append=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            while not stop.is_set():
+                if datetime.now().date() != today:
+                    today = datetime.now().date()
+                    watcher.new_day()
+                    response_cache.evict()
+                    state_store.prune(today)
+                due = watcher.pop_due()
+                if not due:
+                    stop.wait(watcher.seconds_until_next())
+                    continue
+                list(executor.map(watcher.poll, due, itertools.repeat(today)))
+                results = drill_down(watcher.report(due), executor)
+                if report:
+                    report.write(results)
+                send_digest(results)
+                if METRICS_DIR:
+                    metrics.export(METRICS_DIR)
+        finally:
+            if report:
+                report.close()
+
+def verify_webhook_signature(body, signature):
+    if not WEBHOOK_SECRET or not signature:
+        return False
+    expected = "sha256=" + hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+def handle_webhook(event, body):
+    # Returns the HTTP status for a verified delivery
+    if event == "ping":
+        return 200
+    if event != "workflow_run":
+        return 204
+    payload = json.loads(body)
+    run = payload["workflow_run"]
+    state_store.record_webhook_run(payload["repository"]["full_name"], run)
+    metrics.inc("webhook_events_total", action=payload.get("action", "unknown"))
+    return 202
+
+def make_webhook_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not verify_webhook_signature(body, self.headers.get("X-Hub-Signature-256")):
+                status = 401
+            else:
+                try:
+                    status = handle_webhook(self.headers.get("X-GitHub-Event"), body)
+                except (ValueError, KeyError):
+                    status = 400
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return WebhookHandler
+
+def run_webhook_sweep(config, max_workers=MAX_WORKERS, notify=True):
+    # End-of-day pass: repos that report through webhooks are evaluated from stored events, the rest are polled
+    today = datetime.now().date()
+    sweep_start = time.perf_counter()
+    fleet = set(iter_repositories(config))
+    covered = state_store.webhook_repos(today - timedelta(days=WEBHOOK_COVERAGE_DAYS)) & fleet
+    evaluations = {repo: evaluate_repo(repo, state_store.webhook_workflows(repo, today), today) for repo in covered}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scheduler = RetryScheduler(executor)
+        try:
+            futures = start_fleet_checks(config, today, executor, scheduler, skip=covered)
+            results = check_fleet(config, lambda repo: evaluations[repo] if repo in evaluations else futures[repo].result(), executor)
+        finally:
+            scheduler.close()
+
+    if notify:
+        send_digest(results)
+    finish_sweep(today, sweep_start)
+    return results
+
+def run_webhook_receiver(config, port, stop=None):
+    global state_store
+    from http.server import ThreadingHTTPServer
+
+    if state_store is None:
+        state_store = StateStore(":memory:")
+    stop = stop or threading.Event()
+    server = ThreadingHTTPServer((WEBHOOK_HOST, port), make_webhook_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    evaluated_day = None
+    try:
+        # The receiver runs the end-of-day evaluation itself, once per day
+        while not stop.is_set():
+            now = datetime.now()
+            if now.hour >= END_OF_DAY_HOUR and evaluated_day != now.date():
+                run_webhook_sweep(config)
+                evaluated_day = now.date()
+            stop.wait(60)
+    finally:
+        server.shutdown()
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard must look like i/n, e.g. 1/4")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("shard index must be between 1 and the shard count")
+    return index, count
+
+def main():
+    global state_store
+    parser = argparse.ArgumentParser(description="Check GitHub Actions workflow status and send a Discord digest.")
+    parser.add_argument("--shard", type=parse_shard, help="Only evaluate shard i/n of the repositories and write partial results")
+    parser.add_argument("--output", default="shard-results.json", help="Partial results file written in --shard mode")
+    parser.add_argument("--merge", nargs="+", metavar="FILE", help="Merge partial shard results and send notifications")
+    parser.add_argument("--processes", type=int, help="Split the sweep across this many local processes")
+    parser.add_argument("--watch", action="store_true", help="Keep running and poll each repository on its own adaptive schedule")
+    parser.add_argument("--webhook", type=int, metavar="PORT", help="Receive workflow_run webhooks on this port and evaluate them at the end of the day")
+    parser.add_argument("--from-webhooks", action="store_true", help="Evaluate once, using webhook events stored in STATE_DB instead of polling where possible")
+    parser.add_argument("--record", metavar="FILE", help="Run a full sweep and save every workflow runs response to a gzip snapshot")
+    parser.add_argument("--replay", metavar="FILE", help="Re-evaluate a recorded snapshot offline and print the digest instead of sending it")
+    args = parser.parse_args()
+    if args.webhook and not WEBHOOK_SECRET:
+        parser.error("--webhook requires WEBHOOK_SECRET")
+    if args.from_webhooks and state_store is None:
+        parser.error("--from-webhooks requires STATE_DB")
+    if args.record or args.replay:
+        # Snapshots describe a whole day, so incremental state and notification dedupe stay out of the way
+        state_store = None
+    if args.replay:
+        for chunk in build_digest(replay_snapshot(args.replay)):
+            print(chunk)
+        return
+
+    config = discover_repositories(CONFIG)
+    if args.shard:
+        partial = evaluate_shard(config, args.shard)
+        with open(args.output, "w") as output_file:
+            json.dump(partial, output_file)
+    elif args.merge:
+        merge_shards(config, args.merge)
+    elif args.processes:
+        run_sweep_processes(config, args.processes)
+    elif args.watch:
+        try:
+            run_watch(config)
+        except KeyboardInterrupt:
+            pass
+    elif args.webhook:
+        try:
+            run_webhook_receiver(config, args.webhook)
+        except KeyboardInterrupt:
+            pass
+    elif args.from_webhooks:
+        run_webhook_sweep(config)
+    elif args.record:
+        record_sweep(config, args.record)
+    else:
+        run_sweep(config)
 
 if __name__ == "__main__":
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = []
-        for group_key, group in CONFIG.items():
-            group_name = group["name"]
-            for project_key, project in group["projects"].items():
-                project_name = project["name"]
-                futures.append(executor.submit(check_project_workflows, group_name, project_name, project))
-        for future in futures:
-            future.result()  # Wait for all threads to complete
+    if PROFILE_OUTPUT:
+        import cProfile
+        cProfile.run("main()", PROFILE_OUTPUT)
+    else:
+        main()